@@ -1,21 +1,34 @@
 import asyncio
+import hashlib
+import io
 import logging
+import os
+import re
 from aiogram import Bot, Dispatcher, types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Command
-from aiogram.types import ReplyKeyboardRemove
+from aiogram.types import InputFile, ReplyKeyboardRemove
 from aiogram.utils import executor
-from typing import Optional
+from aiogram.utils.exceptions import WrongFileIdentifier
+from typing import Dict, Optional, Tuple
 
 from config import (
     BOT_TOKEN, WELCOME_MESSAGE, PROFILE_PROMPT, 
-    DESCRIPTION_PROMPT, WEBSITE_PROMPT, REPORT_LINKS, SUMMARIZATION_ENABLED
+    DESCRIPTION_PROMPT, WEBSITE_PROMPT, REPORT_LINKS, SUMMARIZATION_ENABLED,
+    REPORTS_DIR, SUMMARIZER_BACKEND, SUMMARY_DRAFTS_ENABLED,
+    ADMIN_IDS, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS, DB_MAINTENANCE_INTERVAL
+)
+from database import (
+    init_db, add_user, get_reports, get_all_users, get_user,
+    get_cached_file_id, save_file_id, run_maintenance
 )
-from database import init_db, add_user, get_reports, get_all_users, get_user
 from keyboards import get_categories_keyboard, get_profile_keyboard
 from states import Form
-from summarizer import generate_personalized_summary
+from summarizer import generate_personalized_summary, generate_draft_summary, load_report_text
 from background import keep_alive
+from throttling import ThrottlingMiddleware, SingleFlight
+import profiler
+from profiler import span, TracingMiddleware
 
 # Configure logging with more detail
 logging.basicConfig(
@@ -27,6 +40,13 @@ logger = logging.getLogger(__name__)
 # Initialize bot and dispatcher
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher(bot)
+dp.middleware.setup(ThrottlingMiddleware())
+dp.middleware.setup(TracingMiddleware())
+
+# Repeated taps on the same category share one in-progress delivery
+category_flight = SingleFlight()
+# Concurrent first sends of the same file share one upload
+upload_flight = SingleFlight()
 
 @dp.message_handler(commands=['start'])
 async def start_command(message: types.Message):
@@ -42,6 +62,78 @@ async def start_command(message: types.Message):
         logger.error(f"Error in start command: {e}", exc_info=True)
         await message.answer("Произошла ошибка. Попробуйте позже.")
 
+# (size, mtime_ns, sha256) per report file, so unchanged files are hashed only once
+_file_hashes: Dict[str, Tuple[int, int, str]] = {}
+
+def _hash_file(path: str) -> str:
+    """Compute SHA-256 of a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def get_file_hash(path: str) -> str:
+    """Return file hash, re-reading the file only when its size or mtime changed"""
+    stat = os.stat(path)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    file_hash = await asyncio.get_running_loop().run_in_executor(None, _hash_file, path)
+    _file_hashes[path] = (stat.st_size, stat.st_mtime_ns, file_hash)
+    return file_hash
+
+async def send_report_document(chat_id: int, file_path: str) -> bool:
+    """Send report file as a document, uploading it only once per file hash"""
+    path = os.path.join(REPORTS_DIR, file_path)
+    if not os.path.isfile(path):
+        return False
+
+    file_hash = await get_file_hash(path)
+    with span("sqlite"):
+        file_id = get_cached_file_id(file_path, file_hash)
+    if file_id:
+        try:
+            with span("telegram"):
+                await bot.send_document(chat_id=chat_id, document=file_id)
+            return True
+        except WrongFileIdentifier as e:
+            logger.warning(f"Cached file_id for {file_path} rejected, re-uploading: {e}")
+            with span("sqlite"):
+                save_file_id(file_path, None, None)
+
+    uploaded_chat_id, file_id = await upload_flight.run(
+        (file_path, file_hash),
+        lambda: upload_report_document(chat_id, file_path, file_hash)
+    )
+    if uploaded_chat_id != chat_id:
+        # Another chat's send uploaded the file meanwhile, reuse its file_id
+        with span("telegram"):
+            await bot.send_document(chat_id=chat_id, document=file_id)
+    return True
+
+async def upload_report_document(chat_id: int, file_path: str, file_hash: str) -> Tuple[int, str]:
+    """Upload report file to a chat, cache and return (chat_id, file_id)"""
+    path = os.path.join(REPORTS_DIR, file_path)
+    with span("telegram_upload"):
+        message = await bot.send_document(
+            chat_id=chat_id,
+            document=InputFile(path, filename=os.path.basename(file_path))
+        )
+    with span("sqlite"):
+        save_file_id(file_path, message.document.file_id, file_hash)
+    logger.info(f"Uploaded {file_path} to Telegram and cached its file_id")
+    return chat_id, message.document.file_id
+
+def escape_markdown(text: str) -> str:
+    """Escape characters that have meaning in Telegram's legacy Markdown"""
+    return re.sub(r"([_*`\[])", r"\\\1", text)
+
+def format_summary(summary: str) -> str:
+    """Format summary block for a Markdown report message"""
+    return f"\n\n💡 Персональный анализ:\n{escape_markdown(summary)}"
+
 async def send_report_with_summary(
     chat_id: int,
     title: str,
@@ -54,28 +146,71 @@ async def send_report_with_summary(
     try:
         base_text = f"📄 **{title}**\nИсточник: {source}"
 
-        # Add file link based on category
+        # Add file link based on category; local files are sent as documents below
+        has_document = os.path.isfile(os.path.join(REPORTS_DIR, file_path))
         if category in REPORT_LINKS:
             file_info = f"\n[Открыть файл]({REPORT_LINKS[category]})"
+        elif has_document:
+            file_info = ""
         else:
             file_info = f"\nФайл: {file_path}"
 
         # Generate summary if enabled and user profile exists
         if SUMMARIZATION_ENABLED and isinstance(user_data, tuple) and len(user_data) >= 3:
             _, _, description, _, _ = user_data
-            summary = await generate_personalized_summary(
-                report_text=f"{title}\n{source}",
+            report_text = None
+            if has_document:
+                with span("report_text"):
+                    report_text = await load_report_text(os.path.join(REPORTS_DIR, file_path))
+            summary_args = dict(
+                report_title=f"{title}\n{source}",
+                report_text=report_text,
                 user_description=description,
                 industry=category
             )
+
+            async def summarize():
+                with span("summary"):
+                    return await generate_personalized_summary(**summary_args)
+
+            # Start the full summary first so the draft overlaps with it
+            summary_task = asyncio.create_task(summarize())
+            await asyncio.sleep(0)  # Let the task send its request before the draft runs
+
+            # Show an instant local draft, then replace it with the full summary
+            draft = None
+            draft_message = None
+            if SUMMARY_DRAFTS_ENABLED and SUMMARIZER_BACKEND != "extractive":
+                draft = await generate_draft_summary(**summary_args)
+                if draft:
+                    with span("telegram"):
+                        draft_message = await bot.send_message(
+                            chat_id=chat_id,
+                            text=base_text + format_summary(draft) + file_info,
+                            parse_mode="Markdown"
+                        )
+
+            summary = await summary_task
             if summary:
-                base_text += f"\n\n💡 Персональный анализ:\n{summary}"
+                base_text += format_summary(summary)
 
-        await bot.send_message(
-            chat_id=chat_id,
-            text=base_text + file_info,
-            parse_mode="Markdown"
-        )
+            if draft_message:
+                if summary and summary != draft:
+                    with span("telegram"):
+                        await draft_message.edit_text(base_text + file_info, parse_mode="Markdown")
+                if has_document:
+                    await send_report_document(chat_id, file_path)
+                return
+
+        with span("telegram"):
+            await bot.send_message(
+                chat_id=chat_id,
+                text=base_text + file_info,
+                parse_mode="Markdown"
+            )
+
+        if has_document:
+            await send_report_document(chat_id, file_path)
     except Exception as e:
         logger.error(f"Error sending report with summary: {e}")
         await bot.send_message(
@@ -83,36 +218,47 @@ async def send_report_with_summary(
             text="Произошла ошибка при отправке отчета. Попробуйте позже."
         )
 
-@dp.message_handler(lambda message: message.text in ["FinTech", "Automotive", "Retail", "Другие"])
-async def get_category(message: types.Message, state: FSMContext):
-    """Handle category selection"""
-    try:
-        category = message.text
-        await state.update_data(category=category)
+async def send_category_reports(message: types.Message, category: str):
+    """Send all reports of a category followed by the profile prompt"""
+    with span("telegram"):
         await message.answer(
             f"Вы выбрали категорию: {category}\nОтправляем отчеты...",
             reply_markup=ReplyKeyboardRemove()
         )
 
+    with span("sqlite"):
         reports = get_reports(category)
         user_data = get_user(message.from_user.id)
 
-        if reports:
-            for report in reports:
-                title, source, file_path = report
-                await send_report_with_summary(
-                    chat_id=message.from_user.id,
-                    title=title,
-                    source=source,
-                    category=category,
-                    file_path=file_path,
-                    user_data=user_data
-                )
-        else:
+    if reports:
+        for report in reports:
+            title, source, file_path = report
+            await send_report_with_summary(
+                chat_id=message.from_user.id,
+                title=title,
+                source=source,
+                category=category,
+                file_path=file_path,
+                user_data=user_data
+            )
+    else:
+        with span("telegram"):
             await message.answer("Пока нет отчетов для этой категории.")
 
-        await asyncio.sleep(3)
+    await asyncio.sleep(3)
+    with span("telegram"):
         await message.answer(PROFILE_PROMPT, reply_markup=get_profile_keyboard())
+
+@dp.message_handler(lambda message: message.text in ["FinTech", "Automotive", "Retail", "Другие"])
+async def get_category(message: types.Message, state: FSMContext):
+    """Handle category selection"""
+    try:
+        category = message.text
+        await state.update_data(category=category)
+        await category_flight.run(
+            (message.from_user.id, category),
+            lambda: send_category_reports(message, category)
+        )
     except Exception as e:
         logger.error(f"Error in category selection: {e}")
         await message.answer("Произошла ошибка. Попробуйте позже.")
@@ -193,6 +339,45 @@ async def show_users(message: types.Message):
     else:
         await message.answer("Пока нет зарегистрированных пользователей.")
 
+@dp.message_handler(commands=['profile'])
+async def profile_command(message: types.Message):
+    """Handle /profile [seconds] admin command"""
+    if message.from_user.id not in ADMIN_IDS:
+        return
+
+    args = message.get_args()
+    if args and not args.isdigit():
+        await message.answer("Использование: /profile [секунды]")
+        return
+    duration = min(int(args) if args else PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS)
+
+    if profiler.is_running():
+        await message.answer("Профилирование уже запущено.")
+        return
+
+    await message.answer(f"⏱ Профилирование запущено на {duration} с.")
+    asyncio.create_task(send_profile(message.chat.id, duration))
+
+async def send_profile(chat_id: int, duration: int):
+    """Run a profiling session and send its results as files"""
+    try:
+        result = await profiler.profile(duration)
+        if result is None:
+            return
+        stats, folded = result
+        await bot.send_document(
+            chat_id,
+            InputFile(io.BytesIO(stats.encode()), filename="profile.txt")
+        )
+        if folded:
+            await bot.send_document(
+                chat_id,
+                InputFile(io.BytesIO(folded.encode()), filename="spans.folded")
+            )
+    except Exception as e:
+        logger.error(f"Error in profiling session: {e}", exc_info=True)
+        await bot.send_message(chat_id, "Ошибка при профилировании.")
+
 async def send_regular_reports():
     """Send daily reports to users"""
     while True:
@@ -217,6 +402,16 @@ async def send_regular_reports():
             logger.error(f"Error in regular reports: {e}")
             await asyncio.sleep(300)  # Wait 5 minutes before retrying
 
+async def run_db_maintenance():
+    """Periodically prune, vacuum, analyze and back up the database"""
+    while True:
+        try:
+            await asyncio.sleep(DB_MAINTENANCE_INTERVAL)
+            # Steps are chunked and blocking, so keep them off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, run_maintenance)
+        except Exception as e:
+            logger.error(f"Error in database maintenance: {e}")
+
 async def on_startup(dp):
     """Startup actions"""
     logger.info("Starting Flask server for keeping the bot alive...")
@@ -229,6 +424,9 @@ async def on_startup(dp):
     asyncio.create_task(send_regular_reports())
     logger.info("Regular reports task started")
 
+    asyncio.create_task(run_db_maintenance())
+    logger.info("Database maintenance task started")
+
 if __name__ == "__main__":
     try:
         logger.info("Starting bot...")
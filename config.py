@@ -10,11 +10,48 @@ if not BOT_TOKEN:
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SUMMARIZATION_ENABLED = bool(OPENAI_API_KEY)
+
+# Summarizer configuration: "openai", "extractive" (local, offline) or "none" to disable
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "openai" if OPENAI_API_KEY else "extractive")
+if SUMMARIZER_BACKEND not in ("openai", "extractive", "none"):
+    raise ValueError(f"Unknown SUMMARIZER_BACKEND: {SUMMARIZER_BACKEND}")
+if SUMMARIZER_BACKEND == "openai" and not OPENAI_API_KEY:
+    raise ValueError("SUMMARIZER_BACKEND=openai requires OPENAI_API_KEY")
+SUMMARIZATION_ENABLED = SUMMARIZER_BACKEND != "none"
+# Fall back to the extractive engine when OpenAI fails
+SUMMARY_FALLBACK_ENABLED = os.getenv("SUMMARY_FALLBACK_ENABLED", "1") == "1"
+# Send an instant extractive draft and replace it once the OpenAI summary arrives
+SUMMARY_DRAFTS_ENABLED = os.getenv("SUMMARY_DRAFTS_ENABLED", "0") == "1"
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+SUMMARY_MAX_SENTENCES = int(os.getenv("SUMMARY_MAX_SENTENCES", "3"))
 
 # Database configuration
 DATABASE_NAME = "database.db"
 
+# Database maintenance: run interval, batch sizes and pause between batches (seconds)
+DB_MAINTENANCE_INTERVAL = int(os.getenv("DB_MAINTENANCE_INTERVAL", str(6 * 3600)))
+DB_MAINTENANCE_CHUNK = 500
+DB_VACUUM_PAGES = 200
+DB_VACUUM_MAX_PAGES = 20000
+DB_MAINTENANCE_PAUSE = 0.05
+DB_BACKUP_DIR = os.getenv("DB_BACKUP_DIR", "backups")
+DB_BACKUP_KEEP = int(os.getenv("DB_BACKUP_KEEP", "3"))
+# Rows older than the TTL are pruned: {table: (timestamp column, max age in days)}
+RETENTION_POLICIES = {}
+
+# Directory with report documents referenced by reports.file_path
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+
+# Anti-flood: messages per second per user, burst size and idle state TTL in seconds
+RATE_LIMIT = float(os.getenv("RATE_LIMIT", "0.5"))
+RATE_BURST = float(os.getenv("RATE_BURST", "3"))
+RATE_STATE_TTL = float(os.getenv("RATE_STATE_TTL", "600"))
+
+# Admins allowed to run service commands like /profile (comma-separated user IDs)
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
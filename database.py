@@ -1,8 +1,13 @@
+import os
 import sqlite3
 import logging
+import time
 from datetime import datetime
 from typing import List, Tuple, Optional
-from config import DATABASE_NAME
+from config import (
+    DATABASE_NAME, DB_MAINTENANCE_CHUNK, DB_VACUUM_PAGES, DB_VACUUM_MAX_PAGES, DB_MAINTENANCE_PAUSE,
+    DB_BACKUP_DIR, DB_BACKUP_KEEP, RETENTION_POLICIES
+)
 
 def get_connection():
     """Create and return a database connection"""
@@ -29,10 +34,14 @@ def init_sample_reports():
             ("Retail", "Digital Retail Innovation", "Gartner", "retail_innovation.pdf")
         ]
 
+        # Keep uploaded Telegram file_ids so re-seeding doesn't force re-uploads
+        cursor.execute("SELECT file_path, file_id, file_hash FROM reports WHERE file_id IS NOT NULL")
+        cached_files = {row[0]: row[1:] for row in cursor.fetchall()}
+
         cursor.execute("DELETE FROM reports")  # Clear existing sample reports
         cursor.executemany(
-            "INSERT INTO reports (category, title, source, file_path) VALUES (?, ?, ?, ?)",
-            sample_reports
+            "INSERT INTO reports (category, title, source, file_path, file_id, file_hash) VALUES (?, ?, ?, ?, ?, ?)",
+            [report + cached_files.get(report[3], (None, None)) for report in sample_reports]
         )
 
         conn.commit()
@@ -52,6 +61,14 @@ def init_db():
         conn = get_connection()
         cursor = conn.cursor()
 
+        # WAL lets handlers read while maintenance writes; incremental auto_vacuum
+        # lets free pages be released in small steps instead of a full VACUUM
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute("VACUUM")  # Required once to switch an existing database
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 user_id INTEGER PRIMARY KEY,
@@ -68,10 +85,19 @@ def init_db():
                 category TEXT NOT NULL,
                 title TEXT NOT NULL,
                 source TEXT NOT NULL,
-                file_path TEXT NOT NULL
+                file_path TEXT NOT NULL,
+                file_id TEXT,
+                file_hash TEXT
             )
         ''')
 
+        # Add Telegram file cache columns to databases created before they existed
+        cursor.execute("PRAGMA table_info(reports)")
+        report_columns = {row[1] for row in cursor.fetchall()}
+        for column in ("file_id", "file_hash"):
+            if column not in report_columns:
+                cursor.execute(f"ALTER TABLE reports ADD COLUMN {column} TEXT")
+
         conn.commit()
 
         # Initialize sample reports after creating tables
@@ -151,4 +177,169 @@ def get_user(user_id: int) -> Optional[Tuple]:
         return None
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+def get_cached_file_id(file_path: str, file_hash: str) -> Optional[str]:
+    """Retrieve Telegram file_id for a report file if its hash still matches"""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT file_id FROM reports WHERE file_path=? AND file_hash=? AND file_id IS NOT NULL LIMIT 1",
+            (file_path, file_hash)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logging.error(f"Error getting cached file_id: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def save_file_id(file_path: str, file_id: Optional[str], file_hash: Optional[str]) -> bool:
+    """Store (or clear, with None) the Telegram file_id for a report file"""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE reports SET file_id=?, file_hash=? WHERE file_path=?",
+            (file_id, file_hash, file_path)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        logging.error(f"Error saving file_id: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def prune_expired(table: str, column: str, max_age_days: int) -> int:
+    """Delete rows older than max_age_days in small batches, return deleted count"""
+    conn = None
+    deleted = 0
+    try:
+        conn = get_connection()
+        while True:
+            cursor = conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN ("
+                f"SELECT rowid FROM {table} WHERE {column} < datetime('now', ?) LIMIT ?)",
+                (f"-{max_age_days} days", DB_MAINTENANCE_CHUNK)
+            )
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < DB_MAINTENANCE_CHUNK:
+                return deleted
+            time.sleep(DB_MAINTENANCE_PAUSE)  # Let handlers take the write lock
+    except Exception as e:
+        logging.error(f"Error pruning {table}: {e}")
+        return deleted
+    finally:
+        if conn:
+            conn.close()
+
+def incremental_vacuum() -> int:
+    """Release up to DB_VACUUM_MAX_PAGES free pages in small steps, return released page count"""
+    conn = None
+    released = 0
+    try:
+        conn = get_connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logging.warning("Skipping incremental vacuum: auto_vacuum is not INCREMENTAL")
+            return released
+
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages and released < DB_VACUUM_MAX_PAGES:
+            step = min(free_pages, DB_VACUUM_PAGES, DB_VACUUM_MAX_PAGES - released)
+            # fetchall() is needed for the pragma to run all of its steps
+            conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break  # No progress, e.g. writers keep freeing pages
+            released += free_pages - remaining
+            free_pages = remaining
+            time.sleep(DB_MAINTENANCE_PAUSE)
+        return released
+    except Exception as e:
+        logging.error(f"Error running incremental vacuum: {e}")
+        return released
+    finally:
+        if conn:
+            conn.close()
+
+def analyze_db():
+    """Refresh query planner statistics"""
+    conn = None
+    try:
+        conn = get_connection()
+        # Bound the rows sampled per index so ANALYZE stays short on large tables
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+        conn.commit()
+    except Exception as e:
+        logging.error(f"Error analyzing database: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def checkpoint_wal():
+    """Copy WAL contents into the database file and truncate the WAL"""
+    conn = None
+    try:
+        conn = get_connection()
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if busy:
+            logging.info("WAL checkpoint could not complete, database is busy")
+    except Exception as e:
+        logging.error(f"Error checkpointing WAL: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def backup_db() -> Optional[str]:
+    """Make an online backup copied in small page batches, keep the latest DB_BACKUP_KEEP"""
+    conn = None
+    backup = None
+    try:
+        os.makedirs(DB_BACKUP_DIR, exist_ok=True)
+        path = os.path.join(DB_BACKUP_DIR, f"database-{datetime.now():%Y%m%d-%H%M%S-%f}.db")
+        conn = get_connection()
+        backup = sqlite3.connect(path)
+        conn.backup(backup, pages=DB_VACUUM_PAGES, sleep=DB_MAINTENANCE_PAUSE)
+
+        backups = sorted(
+            name for name in os.listdir(DB_BACKUP_DIR)
+            if name.startswith("database-") and name.endswith(".db")
+        )
+        for name in backups[:-max(DB_BACKUP_KEEP, 1)]:
+            os.remove(os.path.join(DB_BACKUP_DIR, name))
+        return path
+    except Exception as e:
+        logging.error(f"Error backing up database: {e}")
+        return None
+    finally:
+        if backup:
+            backup.close()
+        if conn:
+            conn.close()
+
+def run_maintenance():
+    """Run all maintenance steps; blocking, meant to be run in an executor"""
+    started = time.monotonic()
+    for table, (column, max_age_days) in RETENTION_POLICIES.items():
+        deleted = prune_expired(table, column, max_age_days)
+        if deleted:
+            logging.info(f"Pruned {deleted} expired rows from {table}")
+
+    released = incremental_vacuum()
+    analyze_db()
+    checkpoint_wal()
+    backup_path = backup_db()
+    logging.info(
+        f"Database maintenance finished in {time.monotonic() - started:.1f}s: "
+        f"{released} pages released, backup {backup_path}"
+    )
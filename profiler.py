@@ -0,0 +1,105 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from aiogram import types
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+# Tracing state; span() is a shared no-op context manager while this is False
+_enabled = False
+_span_totals: Dict[str, float] = defaultdict(float)
+_span_path: ContextVar[Tuple[str, ...]] = ContextVar("span_path", default=())
+_session_lock = asyncio.Lock()
+_NULL_SPAN = nullcontext()
+
+class _Span:
+    """Time a block and add it to the totals under its nested span path"""
+
+    __slots__ = ("path", "token", "started")
+
+    def __init__(self, name: str):
+        self.path = _span_path.get() + (name,)
+
+    def __enter__(self):
+        self.token = _span_path.set(self.path)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _span_totals[";".join(self.path)] += time.perf_counter() - self.started
+        _span_path.reset(self.token)
+        return False
+
+def span(name: str):
+    """Trace span context manager, e.g. ``with span("sqlite"): ...``"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+def is_running() -> bool:
+    """Check whether a profiling session is in progress"""
+    return _session_lock.locked()
+
+async def profile(duration: float, top: int = 50) -> Optional[Tuple[str, str]]:
+    """
+    Profile the event loop thread and collect trace spans for a period of time.
+
+    Args:
+        duration: Session length in seconds
+        top: Number of functions to include in the profile report
+
+    Returns:
+        tuple: (pstats report sorted by cumulative time, spans in folded-stack
+        format for flamegraph tools), or None if a session is already running
+    """
+    global _enabled
+    if _session_lock.locked():
+        return None
+
+    async with _session_lock:
+        _span_totals.clear()
+        profiler = cProfile.Profile()
+        _enabled = True
+        profiler.enable()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.disable()
+            _enabled = False
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+
+        folded = _fold_spans(dict(_span_totals))
+        _span_totals.clear()
+        return stream.getvalue(), folded
+
+def _fold_spans(totals: Dict[str, float]) -> str:
+    """Convert inclusive span totals into folded stacks weighted by self time in microseconds"""
+    self_times = dict(totals)
+    for path, seconds in totals.items():
+        parent = path.rpartition(";")[0]
+        if parent in self_times:
+            self_times[parent] -= seconds
+    return "\n".join(
+        f"{path} {max(int(seconds * 1_000_000), 0)}"
+        for path, seconds in sorted(self_times.items())
+    )
+
+class TracingMiddleware(BaseMiddleware):
+    """Open a root trace span for every message while profiling is on"""
+
+    async def on_pre_process_message(self, message: types.Message, data: dict):
+        if _enabled:
+            data["_trace_span"] = span("update").__enter__()
+
+    async def on_post_process_message(self, message: types.Message, results: list, data: dict):
+        trace_span = data.pop("_trace_span", None)
+        if trace_span is not None:
+            trace_span.__exit__(None, None, None)
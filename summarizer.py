@@ -1,48 +1,290 @@
 import openai
+import asyncio
 import logging
-from typing import Optional
-from config import OPENAI_API_KEY, SUMMARY_SYSTEM_PROMPT
+import math
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import (
+    OPENAI_API_KEY, SUMMARY_SYSTEM_PROMPT, SUMMARIZER_BACKEND,
+    SUMMARY_FALLBACK_ENABLED, SUMMARY_WORKERS, SUMMARY_MAX_SENTENCES
+)
+from throttling import SingleFlight
+from profiler import span
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF reports are then summarized from their title only
+    PdfReader = None
 
 # Configure OpenAI
 openai.api_key = OPENAI_API_KEY
 
-async def generate_personalized_summary(
+# Identical concurrent summary requests share a single backend call
+_summary_flight = SingleFlight()
+
+# Upper bounds on report text kept in memory and sent to OpenAI
+_REPORT_TEXT_MAX_CHARS = 200000
+_OPENAI_TEXT_MAX_CHARS = 6000
+
+# (size, mtime_ns, text) per report file, so documents are parsed only once
+_report_texts: Dict[str, Tuple[int, int, Optional[str]]] = {}
+
+def _read_report_text(path: str) -> Optional[str]:
+    """Extract plain text from a .txt/.md or (with pypdf installed) .pdf report"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".txt", ".md"):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            text = f.read(_REPORT_TEXT_MAX_CHARS)
+    elif extension == ".pdf" and PdfReader is not None:
+        pages = []
+        length = 0
+        for page in PdfReader(path).pages:
+            page_text = page.extract_text() or ""
+            pages.append(page_text)
+            length += len(page_text)
+            if length >= _REPORT_TEXT_MAX_CHARS:
+                break
+        text = "\n".join(pages)[:_REPORT_TEXT_MAX_CHARS]
+    else:
+        return None
+    return text.strip() or None
+
+async def load_report_text(path: str) -> Optional[str]:
+    """Return the body text of a report document, or None if it has none"""
+    try:
+        stat = os.stat(path)
+        cached = _report_texts.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        text = await asyncio.get_running_loop().run_in_executor(None, _read_report_text, path)
+        _report_texts[path] = (stat.st_size, stat.st_mtime_ns, text)
+        return text
+    except Exception as e:
+        logging.error(f"Error reading report text from {path}: {e}")
+        return None
+
+class SummarizerBackend(ABC):
+    """Base class for summarization engines"""
+
+    name = "base"
+
+    @abstractmethod
+    async def summarize(
+        self,
+        report_title: str,
+        report_text: Optional[str],
+        user_description: str,
+        industry: str
+    ) -> Optional[str]:
+        """Return a personalized summary or None if generation fails"""
+
+class OpenAISummarizer(SummarizerBackend):
+    """Summaries generated by the OpenAI chat completions API"""
+
+    name = "openai"
+
+    async def summarize(
+        self,
+        report_title: str,
+        report_text: Optional[str],
+        user_description: str,
+        industry: str
+    ) -> Optional[str]:
+        content = report_title
+        if report_text:
+            content += f"\n\n{report_text[:_OPENAI_TEXT_MAX_CHARS]}"
+        try:
+            response = await openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"""
+                    Industry: {industry}
+                    Business Description: {user_description}
+
+                    Report Content:
+                    {content}
+
+                    Create a concise, personalized summary focusing on aspects relevant
+                    to this specific business and industry. Include actionable insights.
+                    """}
+                ],
+                max_tokens=500,
+                temperature=0.7
+            )
+
+            return response.choices[0].message.content
+        except Exception as e:
+            logging.error(f"Error generating summary: {e}")
+            return None
+
+# BM25 parameters
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+# Word prefix length used as a cheap stemmer for Russian and English inflections
+_STEM_LENGTH = 6
+# Shorter texts are scored inline: a process round-trip would cost more than the scoring
+_INLINE_MAX_CHARS = 20000
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+|\n+")
+_WORD = re.compile(r"\w{3,}")
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into lowercased, prefix-stemmed words"""
+    return [word[:_STEM_LENGTH] for word in _WORD.findall(text.lower())]
+
+def extract_highlights(
     report_text: str,
+    query: str,
+    max_sentences: int = SUMMARY_MAX_SENTENCES
+) -> List[str]:
+    """
+    Pick report sentences most relevant to the query using BM25 scoring.
+
+    Args:
+        report_text: The text content of the report
+        query: Text describing what the reader cares about
+        max_sentences: Maximum number of sentences to return
+
+    Returns:
+        list: Matching sentences in their original order, empty if none match
+    """
+    # Repeated sentences (page headers, footers) would crowd out real highlights
+    sentences = list(dict.fromkeys(s.strip() for s in _SENTENCE_SPLIT.split(report_text) if s.strip()))
+    if not sentences:
+        return []
+
+    documents = [Counter(_tokenize(sentence)) for sentence in sentences]
+    query_terms = set(_tokenize(query))
+
+    # Document frequencies only matter for terms from the query
+    doc_freq: Dict[str, int] = {
+        term: sum(1 for doc in documents if term in doc) for term in query_terms
+    }
+    total = len(documents)
+    idf = {
+        term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for term, df in doc_freq.items() if df
+    }
+    avg_length = sum(sum(doc.values()) for doc in documents) / total or 1.0
+
+    scores = []
+    for doc in documents:
+        length_norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * sum(doc.values()) / avg_length)
+        score = sum(
+            weight * doc[term] * (_BM25_K1 + 1) / (doc[term] + length_norm)
+            for term, weight in idf.items() if term in doc
+        )
+        scores.append(score)
+
+    # Sentences sharing no terms with the query are not highlights
+    matching = [index for index in range(total) if scores[index] > 0]
+    top = sorted(matching, key=lambda index: (-scores[index], index))[:max_sentences]
+    return [sentences[index] for index in sorted(top)]
+
+class ExtractiveSummarizer(SummarizerBackend):
+    """Offline summaries built from report sentences matching the user's profile"""
+
+    name = "extractive"
+
+    def __init__(self, workers: int = SUMMARY_WORKERS, max_sentences: int = SUMMARY_MAX_SENTENCES):
+        self.workers = workers
+        self.max_sentences = max_sentences
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def summarize(
+        self,
+        report_title: str,
+        report_text: Optional[str],
+        user_description: str,
+        industry: str
+    ) -> Optional[str]:
+        # Highlights need a report body; the title alone is not a summary
+        if not report_text:
+            return None
+        try:
+            query = f"{industry} {user_description}"
+            if len(report_text) <= _INLINE_MAX_CHARS:
+                highlights = extract_highlights(report_text, query, self.max_sentences)
+            else:
+                highlights = await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), extract_highlights, report_text, query, self.max_sentences
+                )
+            if not highlights:
+                return None
+            return "\n".join(f"• {sentence}" for sentence in highlights)
+        except Exception as e:
+            logging.error(f"Error extracting summary: {e}")
+            return None
+
+_BACKENDS = {
+    OpenAISummarizer.name: OpenAISummarizer,
+    ExtractiveSummarizer.name: ExtractiveSummarizer,
+}
+_instances: Dict[str, SummarizerBackend] = {}
+
+def get_backend(name: str) -> SummarizerBackend:
+    """Return a shared backend instance by name"""
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+    return _instances[name]
+
+async def generate_personalized_summary(
+    report_title: str,
+    report_text: Optional[str],
     user_description: str,
     industry: str
 ) -> Optional[str]:
     """
     Generate a personalized summary of a report based on user's business profile.
+    Concurrent calls with the same arguments share one request.
 
     Args:
-        report_text: The text content of the report
+        report_title: Report title and source
+        report_text: The text content of the report, None if unavailable
         user_description: Description of user's business/product
         industry: User's industry category
 
     Returns:
         str: Personalized summary or None if generation fails
     """
-    try:
-        response = await openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
-                {"role": "user", "content": f"""
-                Industry: {industry}
-                Business Description: {user_description}
-
-                Report Content:
-                {report_text}
-
-                Create a concise, personalized summary focusing on aspects relevant 
-                to this specific business and industry. Include actionable insights.
-                """}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+    return await _summary_flight.run(
+        (report_title, report_text, user_description, industry),
+        lambda: _summarize(report_title, report_text, user_description, industry)
+    )
 
-        return response.choices[0].message.content
-    except Exception as e:
-        logging.error(f"Error generating summary: {e}")
-        return None
\ No newline at end of file
+async def generate_draft_summary(
+    report_title: str,
+    report_text: Optional[str],
+    user_description: str,
+    industry: str
+) -> Optional[str]:
+    """Generate an instant extractive summary to show before the main backend responds"""
+    return await get_backend(ExtractiveSummarizer.name).summarize(
+        report_title, report_text, user_description, industry
+    )
+
+async def _summarize(
+    report_title: str,
+    report_text: Optional[str],
+    user_description: str,
+    industry: str
+) -> Optional[str]:
+    """Run the configured backend, falling back to the extractive engine"""
+    backend = get_backend(SUMMARIZER_BACKEND)
+    with span(backend.name):
+        summary = await backend.summarize(report_title, report_text, user_description, industry)
+    if summary is None and SUMMARY_FALLBACK_ENABLED and backend.name != ExtractiveSummarizer.name:
+        logging.warning(f"Summarizer backend {backend.name} failed, using extractive fallback")
+        summary = await generate_draft_summary(report_title, report_text, user_description, industry)
+    return summary
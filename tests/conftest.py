@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+# config.py refuses to load without a token; aiogram only checks its format
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+
+import database
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(database, "DATABASE_NAME", path)
+    monkeypatch.setattr(database, "DB_MAINTENANCE_PAUSE", 0)
+    return path
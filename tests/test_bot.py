@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import InputFile
+
+import bot
+import database
+
+
+class FakeBot:
+    """Records send_document calls, returning a fresh file_id for every upload"""
+
+    def __init__(self):
+        self.sent = []
+        self.messages = []
+        self.uploads = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.messages.append(text)
+        messages = self.messages
+
+        async def edit_text(new_text, parse_mode=None):
+            messages.append(new_text)
+
+        return SimpleNamespace(edit_text=edit_text)
+
+    async def send_document(self, chat_id, document):
+        await asyncio.sleep(0.01)
+        self.sent.append((chat_id, document))
+        if isinstance(document, InputFile):
+            self.uploads += 1
+            document = f"FILE_ID_{self.uploads}"
+        return SimpleNamespace(document=SimpleNamespace(file_id=document))
+
+
+@pytest.fixture
+def fake_bot(db_path, tmp_path, monkeypatch):
+    database.init_db()
+    monkeypatch.setattr(bot, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(bot, "_file_hashes", {})
+    fake = FakeBot()
+    monkeypatch.setattr(bot, "bot", fake)
+    (tmp_path / "ev_market_2024.pdf").write_bytes(b"report v1")
+    return fake
+
+
+def test_send_report_document_uploads_once_and_reuses_file_id(fake_bot):
+    asyncio.run(bot.send_report_document(1, "ev_market_2024.pdf"))
+    asyncio.run(bot.send_report_document(2, "ev_market_2024.pdf"))
+
+    assert fake_bot.uploads == 1
+    assert fake_bot.sent[1] == (2, "FILE_ID_1")
+
+
+def test_send_report_document_reuploads_when_file_changes(fake_bot, tmp_path):
+    asyncio.run(bot.send_report_document(1, "ev_market_2024.pdf"))
+    (tmp_path / "ev_market_2024.pdf").write_bytes(b"report v2, updated")
+    asyncio.run(bot.send_report_document(1, "ev_market_2024.pdf"))
+
+    assert fake_bot.uploads == 2
+    file_hash = bot._hash_file(str(tmp_path / "ev_market_2024.pdf"))
+    assert database.get_cached_file_id("ev_market_2024.pdf", file_hash) == "FILE_ID_2"
+
+
+def test_concurrent_first_sends_share_one_upload(fake_bot):
+    async def send_to_three_chats():
+        await asyncio.gather(*[
+            bot.send_report_document(chat_id, "ev_market_2024.pdf") for chat_id in (1, 2, 3)
+        ])
+
+    asyncio.run(send_to_three_chats())
+
+    assert fake_bot.uploads == 1
+    assert sorted(chat_id for chat_id, _ in fake_bot.sent) == [1, 2, 3]
+
+
+def test_send_report_document_skips_missing_file(fake_bot):
+    assert asyncio.run(bot.send_report_document(1, "missing.pdf")) is False
+    assert fake_bot.sent == []
+
+
+USER = (1, "FinTech", "mobile payments", "https://example.com", "2025-01-01")
+
+
+def test_summary_is_escaped_for_markdown(fake_bot, monkeypatch):
+    async def summary(**kwargs):
+        return "Use *_payments_* [beta] `api`"
+
+    monkeypatch.setattr(bot, "SUMMARIZATION_ENABLED", True)
+    monkeypatch.setattr(bot, "generate_personalized_summary", summary)
+
+    asyncio.run(bot.send_report_with_summary(1, "Title", "Source", "Retail", "none.pdf", USER))
+
+    assert "Use \\*\\_payments\\_\\* \\[beta] \\`api\\`" in fake_bot.messages[0]
+
+
+def test_full_summary_starts_before_draft_is_sent(fake_bot, monkeypatch):
+    events = []
+
+    async def draft(**kwargs):
+        events.append("draft")
+        return "draft text"
+
+    async def summary(**kwargs):
+        events.append("summary started")
+        await asyncio.sleep(0.05)
+        return "full text"
+
+    monkeypatch.setattr(bot, "SUMMARIZATION_ENABLED", True)
+    monkeypatch.setattr(bot, "SUMMARY_DRAFTS_ENABLED", True)
+    monkeypatch.setattr(bot, "SUMMARIZER_BACKEND", "openai")
+    monkeypatch.setattr(bot, "generate_draft_summary", draft)
+    monkeypatch.setattr(bot, "generate_personalized_summary", summary)
+
+    asyncio.run(bot.send_report_with_summary(1, "Title", "Source", "Retail", "none.pdf", USER))
+
+    assert events[0] == "summary started"
+    assert "draft text" in fake_bot.messages[0]
+    assert "full text" in fake_bot.messages[1]
@@ -0,0 +1,165 @@
+import sqlite3
+
+import database
+
+
+def make_db(path, auto_vacuum: str, rows: int = 300) -> int:
+    """Create a database with free pages, return its freelist_count"""
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA auto_vacuum={auto_vacuum}")
+    conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, payload BLOB)")
+    conn.executemany("INSERT INTO blobs (payload) VALUES (?)", [(b"x" * 4000,) for _ in range(rows)])
+    conn.commit()
+    conn.execute("DELETE FROM blobs")
+    conn.commit()
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.close()
+    return free_pages
+
+
+def freelist_count(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_incremental_vacuum_releases_free_pages(db_path):
+    free_pages = make_db(db_path, "INCREMENTAL")
+    assert free_pages > 0
+
+    assert database.incremental_vacuum() == free_pages
+    assert freelist_count(db_path) == 0
+
+
+def test_incremental_vacuum_skips_non_incremental_database(db_path):
+    free_pages = make_db(db_path, "NONE")
+    assert free_pages > 0
+
+    assert database.incremental_vacuum() == 0
+    assert freelist_count(db_path) == free_pages
+
+
+def test_incremental_vacuum_caps_pages_per_run(db_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_VACUUM_PAGES", 20)
+    monkeypatch.setattr(database, "DB_VACUUM_MAX_PAGES", 50)
+    free_pages = make_db(db_path, "INCREMENTAL")
+
+    assert database.incremental_vacuum() == 50
+    assert freelist_count(db_path) == free_pages - 50
+
+
+def test_incremental_vacuum_stops_without_progress(db_path, monkeypatch):
+    make_db(db_path, "INCREMENTAL")
+
+    class NoProgressConnection:
+        """Connection whose incremental_vacuum pragma frees nothing"""
+
+        def __init__(self, conn):
+            self.conn = conn
+
+        def execute(self, sql, *args):
+            if sql.startswith("PRAGMA incremental_vacuum"):
+                return self.conn.execute("SELECT 1")
+            return self.conn.execute(sql, *args)
+
+        def close(self):
+            self.conn.close()
+
+    monkeypatch.setattr(
+        database, "get_connection", lambda: NoProgressConnection(sqlite3.connect(db_path))
+    )
+    assert database.incremental_vacuum() == 0
+
+
+def test_init_db_adds_file_cache_columns_to_old_reports_table(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT NOT NULL, "
+        "title TEXT NOT NULL, source TEXT NOT NULL, file_path TEXT NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+
+    conn = sqlite3.connect(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+    conn.close()
+    assert {"file_id", "file_hash"} <= columns
+
+
+def test_sample_reports_reseed_keeps_cached_file_ids(db_path):
+    database.init_db()
+    assert database.save_file_id("ev_market_2024.pdf", "FILE_ID", "hash-1")
+
+    database.init_db()
+
+    assert database.get_cached_file_id("ev_market_2024.pdf", "hash-1") == "FILE_ID"
+    assert database.get_cached_file_id("ev_market_2024.pdf", "hash-2") is None
+    assert database.get_cached_file_id("ecommerce_2025.pdf", "hash-1") is None
+
+
+def test_prune_expired_deletes_old_rows_in_chunks(db_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_MAINTENANCE_CHUNK", 10)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY, created_at TIMESTAMP)")
+    conn.executemany(
+        "INSERT INTO logs (created_at) VALUES (datetime('now', ?))",
+        [("-30 days",)] * 25 + [("-1 days",)] * 5
+    )
+    conn.commit()
+    conn.close()
+
+    statements = []
+
+    def traced_connection():
+        conn = sqlite3.connect(db_path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(database, "get_connection", traced_connection)
+
+    assert database.prune_expired("logs", "created_at", 7) == 25
+    assert sum(statement.startswith("DELETE") for statement in statements) == 3
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] == 5
+    conn.close()
+
+
+def test_backup_db_keeps_latest_backups(db_path, tmp_path, monkeypatch):
+    backup_dir = tmp_path / "backups"
+    monkeypatch.setattr(database, "DB_BACKUP_DIR", str(backup_dir))
+    monkeypatch.setattr(database, "DB_BACKUP_KEEP", 2)
+    database.init_db()
+
+    paths = [database.backup_db() for _ in range(3)]
+
+    assert all(paths)
+    assert sorted(str(path) for path in backup_dir.iterdir()) == sorted(paths[1:])
+    conn = sqlite3.connect(paths[-1])
+    assert conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] > 0
+    conn.close()
+
+
+def test_init_db_switches_existing_database_to_incremental_wal(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE users (user_id INTEGER PRIMARY KEY, category TEXT NOT NULL, "
+        "description TEXT NOT NULL, website TEXT NOT NULL, "
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("INSERT INTO users (user_id, category, description, website) VALUES (1, 'FinTech', 'd', 'w')")
+    conn.commit()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+
+    database.init_db()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    assert database.get_user(1)[:2] == (1, "FinTech")
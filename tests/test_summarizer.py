@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import summarizer
+from summarizer import ExtractiveSummarizer, extract_highlights
+
+REPORT = (
+    "Banks grow. Mobile payments surge across Europe. "
+    "Weather was fine. Payments via mobile wallets doubled."
+)
+
+
+def test_highlights_rank_sentences_matching_query():
+    highlights = extract_highlights(REPORT, "mobile payments", max_sentences=1)
+
+    assert highlights == ["Mobile payments surge across Europe."]
+
+
+def test_highlights_drop_sentences_without_query_terms():
+    highlights = extract_highlights(REPORT, "mobile payments app", max_sentences=3)
+
+    assert highlights == [
+        "Mobile payments surge across Europe.",
+        "Payments via mobile wallets doubled.",
+    ]
+    assert extract_highlights(REPORT, "quantum") == []
+
+
+def test_highlights_remove_duplicate_sentences():
+    text = "Mobile payments surge. Weather was fine.\n" * 10
+
+    assert extract_highlights(text, "mobile payments", max_sentences=3) == ["Mobile payments surge."]
+
+
+@pytest.mark.parametrize("report_text", [None, ""])
+def test_extractive_summary_needs_report_body(report_text):
+    summary = asyncio.run(
+        ExtractiveSummarizer().summarize("Title\nSource", report_text, "mobile payments", "FinTech")
+    )
+
+    assert summary is None
+
+
+def test_extractive_summary_formats_highlights():
+    summary = asyncio.run(
+        ExtractiveSummarizer().summarize("Title\nSource", REPORT, "mobile payments", "FinTech")
+    )
+
+    assert summary == "• Mobile payments surge across Europe.\n• Payments via mobile wallets doubled."
+
+
+def test_extractive_summary_uses_process_pool_for_long_reports(monkeypatch):
+    engine = ExtractiveSummarizer(workers=1)
+    pool_requests = []
+    get_pool = engine._get_pool
+    monkeypatch.setattr(engine, "_get_pool", lambda: pool_requests.append(1) or get_pool())
+
+    asyncio.run(engine.summarize("Title", REPORT, "mobile payments", "FinTech"))
+    assert pool_requests == []
+
+    long_report = REPORT + " " + "Filler sentence number. " * (summarizer._INLINE_MAX_CHARS // 20)
+    try:
+        summary = asyncio.run(engine.summarize("Title", long_report, "mobile payments", "FinTech"))
+    finally:
+        engine._pool.shutdown()
+
+    assert pool_requests == [1]
+    assert summary == "• Mobile payments surge across Europe.\n• Payments via mobile wallets doubled."
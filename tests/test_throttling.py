@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import throttling
+from throttling import SingleFlight, ThrottlingMiddleware
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_burst_then_denies(clock):
+    middleware = ThrottlingMiddleware(rate=1, burst=3, ttl=600)
+
+    assert [middleware.allow(1) for _ in range(4)] == [True, True, True, False]
+    assert middleware.allow(2)
+
+
+def test_bucket_refills_at_rate(clock):
+    middleware = ThrottlingMiddleware(rate=0.5, burst=2, ttl=600)
+    assert middleware.allow(1) and middleware.allow(1)
+    assert not middleware.allow(1)
+
+    clock[0] += 1  # Half a token
+    assert not middleware.allow(1)
+    clock[0] += 1
+    assert middleware.allow(1)
+    assert not middleware.allow(1)
+
+
+def test_sweep_removes_idle_users(clock):
+    middleware = ThrottlingMiddleware(rate=1, burst=3, ttl=60)
+    middleware.allow(1)
+    clock[0] += 30
+    middleware.allow(2)
+
+    clock[0] += 40  # User 1 idle for 70s, user 2 for 40s
+    middleware.allow(3)
+
+    assert set(middleware._buckets) == {2, 3}
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.run("key", work) for _ in range(5)])
+        await asyncio.sleep(0)
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight._inflight == {}
+
+
+def test_single_flight_passes_exception_to_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *[flight.run("key", fail) for _ in range(3)], return_exceptions=True
+        )
+        await asyncio.sleep(0)
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight._inflight == {}
+
+
+def test_single_flight_runs_again_after_completion():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight()
+        first = await flight.run("key", work)
+        await asyncio.sleep(0)
+        return first, await flight.run("key", work)
+
+    assert asyncio.run(main()) == (1, 2)
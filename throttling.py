@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from aiogram import types
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from config import RATE_LIMIT, RATE_BURST, RATE_STATE_TTL
+
+logger = logging.getLogger(__name__)
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Per-user token bucket anti-flood middleware"""
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        burst: float = RATE_BURST,
+        ttl: float = RATE_STATE_TTL
+    ):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.ttl = ttl
+        # user_id -> (tokens, last_seen); tuples keep per-user state small
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+        self._next_sweep = time.monotonic() + ttl
+
+    def _sweep(self, now: float):
+        """Drop buckets of users idle longer than TTL (they would be full anyway)"""
+        expired = [user_id for user_id, (_, last) in self._buckets.items() if now - last > self.ttl]
+        for user_id in expired:
+            del self._buckets[user_id]
+        self._next_sweep = now + self.ttl
+
+    def allow(self, user_id: int) -> bool:
+        """Take a token from user's bucket, return False if it is empty"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        tokens, last = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return False
+
+        self._buckets[user_id] = (tokens - 1, now)
+        return True
+
+    async def on_process_message(self, message: types.Message, data: dict):
+        """Silently drop messages from users who exceeded their rate"""
+        if message.from_user and not self.allow(message.from_user.id):
+            logger.debug(f"Throttled message from user {message.from_user.id}")
+            raise CancelHandler()
+
+class SingleFlight:
+    """Share one in-progress result between concurrent calls with the same key"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() once per key; concurrent callers get the same result"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._inflight[key] = future
+        # Forget the key once the work is done, even if every caller was cancelled
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)